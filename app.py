@@ -1,11 +1,18 @@
 import streamlit as st
 import requests
-from xml.etree import ElementTree
+import diskcache
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from lxml import etree
 import pandas as pd
+import numpy as np
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, wait, TimeoutError
+import threading
+import socket
 import io
-from urllib.parse import urlparse
+import zlib
+import itertools
 import time
 
 st.set_page_config(
@@ -17,30 +24,257 @@ st.set_page_config(
 st.title("🔍 Domain Page Counter")
 st.caption("Quickly analyse domain page counts from sitemaps")
 
+SCHEME_RE = re.compile(r'^https?://')
+PATH_RE = re.compile(r'[/?#]')
+WWW_RE = re.compile(r'^www\.')
+VECTORISE_THRESHOLD = 500  # Lines above which pandas string ops beat a Python loop
+
 def clean_domain(url_or_domain):
     """Clean and standardise domain input"""
     if not url_or_domain:
         return None
     
-    url_or_domain = url_or_domain.strip()
-    
-    # If it looks like a full URL, extract domain
-    if url_or_domain.startswith(('http://', 'https://')):
-        parsed = urlparse(url_or_domain)
-        domain = parsed.netloc
-    else:
-        domain = url_or_domain
+    # Drop any scheme and path so URLs and bare domains normalise the same way
+    domain = SCHEME_RE.sub('', url_or_domain.strip().lower())
+    domain = PATH_RE.split(domain, 1)[0]
     
-    # Remove www and clean
-    domain = re.sub(r'^www\.', '', domain.lower())
-    domain = domain.rstrip('/')
+    # Remove www
+    domain = WWW_RE.sub('', domain)
     
     return domain if domain else None
 
-def get_page_count(domain, timeout_seconds=15):
-    """Get page count with comprehensive timeout handling"""
+def clean_domains(lines):
+    """Clean a list of pasted lines into unique domains, preserving input order"""
+    if len(lines) < VECTORISE_THRESHOLD:
+        domains = (clean_domain(line) for line in lines)
+        return list(dict.fromkeys(d for d in domains if d))
+    
+    domains = pd.Series(lines, dtype=str).str.strip().str.lower()
+    domains = domains.str.replace(SCHEME_RE, '', regex=True)
+    domains = domains.str.split(PATH_RE, n=1, regex=True).str[0]
+    domains = domains.str.replace(WWW_RE, '', regex=True)
+    return domains[domains != ''].drop_duplicates().tolist()
+
+ANALYSIS_TTL = 60 * 60  # How long a finished run is reused for the same domain list
+PROGRESS_INTERVAL = 0.1  # Minimum seconds between progress bar updates
+
+@st.cache_data(show_spinner=False)
+def parse_input(text):
+    """Cached input parsing so reruns don't re-clean an unchanged paste"""
+    return clean_domains(text.splitlines())
+
+MAX_WORKERS = 32  # Concurrent domains; threads spend almost all their time waiting on sockets
+POOL_SIZE = 64
+
+@st.cache_resource
+def get_session():
+    """Shared HTTP session so connections are pooled and kept alive across domains"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (compatible; PageCounter/1.0)',
+        # Every compression urllib3 can decode here (gzip, deflate, plus br/zstd when installed)
+        **make_headers(accept_encoding=True)
+    })
+    return session
+
+CACHE_DIR = '.sitemap_cache'
+CACHE_TTL = 24 * 60 * 60  # Successful scans
+FAILED_CACHE_TTL = 60 * 60  # Unreachable domains / no sitemap
+CACHE_RETAIN = 7 * 24 * 60 * 60  # Stale entries with validators kept for conditional re-checks
+
+@st.cache_resource
+def get_cache():
+    """Persistent page-count cache so repeat runs skip the network"""
+    return diskcache.Cache(CACHE_DIR)
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+TAG_URL = f'{SITEMAP_NS}url'
+TAG_SITEMAP = f'{SITEMAP_NS}sitemap'
+TAG_LOC = f'{SITEMAP_NS}loc'
+GZIP_MAGIC = b'\x1f\x8b'
+CHUNK_SIZE = 64 * 1024
+MIN_SITEMAP_BYTES = 50  # Smaller than any sitemap with a single entry
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024  # Sitemap protocol size limit
+MAX_SUB_SITEMAPS = 10  # Limit sitemaps fetched from an index to avoid timeout
+
+class SitemapCounter:
+    """lxml parser target that tallies sitemap entries without building any elements"""
+    
+    def __init__(self, max_locs):
+        self.max_locs = max_locs
+        self.url_count = 0
+        self.sitemap_count = 0
+        self.sitemap_locs = []
+        self.in_sitemap = False
+        self.loc_parts = None  # Text of the <loc> currently being captured
+    
+    def start(self, tag, attrib):
+        if tag == TAG_URL:
+            self.url_count += 1
+        elif tag == TAG_SITEMAP:
+            self.sitemap_count += 1
+            self.in_sitemap = True
+        elif tag == TAG_LOC and self.in_sitemap and len(self.sitemap_locs) < self.max_locs:
+            # Only the locations we will actually fetch are kept
+            self.loc_parts = []
+    
+    def end(self, tag):
+        if tag == TAG_SITEMAP:
+            self.in_sitemap = False
+        elif tag == TAG_LOC and self.loc_parts is not None:
+            loc = ''.join(self.loc_parts).strip()
+            if loc:
+                self.sitemap_locs.append(loc)
+            self.loc_parts = None
+    
+    def data(self, data):
+        if self.loc_parts is not None:
+            self.loc_parts.append(data)
+    
+    def close(self):
+        return self.url_count, self.sitemap_count, self.sitemap_locs
+
+def parse_sitemap(response, max_locs=MAX_SUB_SITEMAPS):
+    """Stream a sitemap response, returning its URL count, child sitemap count and the first child locations"""
+    # Sitemaps are untrusted input: never expand external entities or fetch DTDs
+    parser = etree.XMLParser(
+        target=SitemapCounter(max_locs), resolve_entities=False, no_network=True, huge_tree=False
+    )
+    
+    chunks = response.iter_content(CHUNK_SIZE)
+    first_chunk = next(chunks, b'')
+    # .xml.gz sitemaps are often served without a Content-Encoding header, so inflate them ourselves
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS) if first_chunk[:2] == GZIP_MAGIC else None
+    
+    for chunk in itertools.chain((first_chunk,), chunks):
+        parser.feed(inflater.decompress(chunk) if inflater else chunk)
+    
+    return parser.close()
+
+# Fetches started during this script run, keyed by sitemap URL, so domains sharing a sitemap share one download
+SITEMAP_FETCHES = {}
+SITEMAP_FETCHES_LOCK = threading.Lock()
+
+def fetch_sitemap(session, url, timeout):
+    """Download and parse a sitemap, returning None if it isn't served"""
+    with session.get(url, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            return None
+        
+        # Cache validators let a later run confirm the count with a bodiless 304
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        validators = None
+        if etag or last_modified:
+            validators = {'sitemap_url': url, 'etag': etag, 'last_modified': last_modified}
+        
+        return parse_sitemap(response) + (validators,)
+
+def sitemap_unchanged(session, cached, timeout):
+    """Conditionally re-request the sitemap behind a cached count, True if the server answers 304"""
+    headers = {}
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    if not headers:
+        return False
+    
+    try:
+        with session.get(cached['sitemap_url'], headers=headers, timeout=timeout, stream=True) as response:
+            return response.status_code == 304
+    except requests.RequestException:
+        return False
+
+def fetch_sitemap_once(session, url, timeout):
+    """fetch_sitemap, coalescing concurrent and repeated requests for the same URL"""
+    with SITEMAP_FETCHES_LOCK:
+        future = SITEMAP_FETCHES.get(url)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            SITEMAP_FETCHES[url] = future
+    
+    if is_owner:
+        try:
+            future.set_result(fetch_sitemap(session, url, timeout))
+        except Exception as e:
+            future.set_exception(e)
+    
+    return future.result()
+
+def count_sitemap_urls(session, url, timeout):
+    """Count the URLs in a single sitemap, treating any failure as zero"""
+    try:
+        parsed = fetch_sitemap_once(session, url, timeout)
+        if parsed:
+            return parsed[0]
+    except Exception:
+        pass  # Skip failed individual sitemaps
+    return 0
+
+def looks_like_sitemap(response):
+    """Judge from headers alone whether a 200 response could be a sitemap"""
+    content_type = response.headers.get('Content-Type', '').lower()
+    if 'html' in content_type and 'xml' not in content_type:
+        return False  # Usually the homepage served as a catch-all for unknown paths
+    
+    # HEAD replies for generated sitemaps often carry Content-Length: 0, so treat zero as unknown
+    content_length = response.headers.get('Content-Length', '')
+    if content_length.isdigit() and int(content_length) > 0:
+        return MIN_SITEMAP_BYTES <= int(content_length) <= MAX_SITEMAP_BYTES
+    
+    return True
+
+def url_exists(session, url, timeout):
+    """Check a URL returns 200 with sitemap-like headers without downloading its body"""
+    try:
+        response = session.head(url, timeout=timeout, allow_redirects=True)
+        if response.status_code in (405, 501):
+            # Server doesn't support HEAD - fall back to a GET we close before reading
+            with session.get(url, timeout=timeout, stream=True) as response:
+                pass
+        return response.status_code == 200 and looks_like_sitemap(response)
+    except requests.RequestException:
+        return False
+
+def existing_urls(session, urls, timeout):
+    """Probe all URLs concurrently, yielding those that exist in their original priority order"""
+    executor = ThreadPoolExecutor(max_workers=len(urls))
+    try:
+        probes = [executor.submit(url_exists, session, url, timeout) for url in urls]
+        for url, probe in zip(urls, probes):
+            if probe.result():
+                yield url
+    finally:
+        # Don't hold the domain up waiting on lower-priority probes once we've found a sitemap
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def has_subdomain(domain):
+    """Rough check for a subdomain, treating country suffixes like co.uk as a single label"""
+    labels = domain.split('.')
+    if len(labels) >= 3 and len(labels[-1]) == 2 and len(labels[-2]) <= 3:
+        return len(labels) > 3
+    return len(labels) > 2
+
+CONNECT_TIMEOUT = 3  # Seconds to establish a connection before giving up on a host
+HOMEPAGE_SAMPLE_BYTES = 512 * 1024  # Enough markup for the homepage estimate
+
+def get_page_count(domain, session, timeout_seconds=15, cached=None):
+    """Get page count with comprehensive timeout handling, plus the counted sitemap's cache validators"""
     if not domain:
-        return 0, "Invalid domain"
+        return 0, "Invalid domain", None
+    
+    # Fail fast on hosts that won't accept a connection, but give slow bodies the full budget
+    timeout = (CONNECT_TIMEOUT, timeout_seconds)
+    
+    # A stale cache entry whose sitemap hasn't changed is still correct
+    if cached and cached.get('sitemap_url') and sitemap_unchanged(session, cached, timeout):
+        validators = {key: cached.get(key) for key in ('sitemap_url', 'etag', 'last_modified')}
+        return cached['pages'], cached['method'], validators
     
     # List of common sitemap locations to try
     sitemap_urls = [
@@ -51,83 +285,67 @@ def get_page_count(domain, timeout_seconds=15):
         f"https://{domain}/wp-sitemap.xml",  # WordPress default
         f"https://www.{domain}/wp-sitemap.xml",
         f"https://{domain}/sitemap-index.xml",  # Alternative naming
-        f"https://www.{domain}/sitemap-index.xml"
+        f"https://www.{domain}/sitemap-index.xml",
+        f"https://{domain}/sitemap.xml.gz",  # Compressed variants
+        f"https://{domain}/sitemap_index.xml.gz"
     ]
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (compatible; PageCounter/1.0)'
-    }
-    
-    session = requests.Session()
-    session.headers.update(headers)
+    if has_subdomain(domain):
+        # www.blog.example.com almost never exists, so don't spend probes on it
+        sitemap_urls = [url for url in sitemap_urls if not url.startswith(f"https://www.{domain}/")]
     
     total_pages = 0
     method = "No sitemap found"
+    validators = None
     
-    for sitemap_url in sitemap_urls:
+    for sitemap_url in existing_urls(session, sitemap_urls, timeout):
         try:
-            response = session.get(sitemap_url, timeout=timeout_seconds)
-            
-            if response.status_code == 200:
-                try:
-                    root = ElementTree.fromstring(response.content)
-                    
-                    # Check if it's a sitemap index
-                    sitemap_elements = root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}sitemap')
-                    
-                    if sitemap_elements:
-                        # It's a sitemap index - get all individual sitemaps
-                        individual_sitemaps = []
-                        for sitemap in sitemap_elements:
-                            loc = sitemap.find('{http://www.sitemaps.org/schemas/sitemap/0.9}loc')
-                            if loc is not None:
-                                individual_sitemaps.append(loc.text)
-                        
-                        # Count URLs in all individual sitemaps
-                        for individual_sitemap in individual_sitemaps[:10]:  # Limit to 10 sitemaps to avoid timeout
-                            try:
-                                sub_response = session.get(individual_sitemap, timeout=timeout_seconds)
-                                if sub_response.status_code == 200:
-                                    sub_root = ElementTree.fromstring(sub_response.content)
-                                    urls = sub_root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}url')
-                                    total_pages += len(urls)
-                            except:
-                                continue  # Skip failed individual sitemaps
-                        
-                        method = f"Sitemap index ({len(individual_sitemaps)} sitemaps)"
-                        break
-                    else:
-                        # It's a regular sitemap
-                        urls = root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}url')
-                        total_pages = len(urls)
-                        method = "Single sitemap"
-                        break
-                        
-                except ElementTree.ParseError:
-                    continue  # Try next sitemap URL
-                    
-        except (requests.RequestException, TimeoutError):
+            parsed = fetch_sitemap_once(session, sitemap_url, timeout)
+        except (etree.XMLSyntaxError, zlib.error, requests.RequestException):
             continue  # Try next sitemap URL
+        
+        if parsed is None:
+            continue
+        
+        url_count, sitemap_count, individual_sitemaps, validators = parsed
+        
+        if sitemap_count:
+            # It's a sitemap index - count URLs in all individual sitemaps
+            # Fetch a few at a time to respect the host
+            with ThreadPoolExecutor(max_workers=5) as sub_executor:
+                total_pages = sum(sub_executor.map(
+                    lambda url: count_sitemap_urls(session, url, timeout),
+                    individual_sitemaps
+                ))
+            
+            method = f"Sitemap index ({sitemap_count} sitemaps)"
+            # A 304 on the index says nothing about its children, so this total can't be revalidated
+            validators = None
+        else:
+            # It's a regular sitemap
+            total_pages = url_count
+            method = "Single sitemap"
+        break
     
     # If no pages found, try robots.txt and alternative methods
     if total_pages == 0:
+        validators = None  # Any estimate below isn't backed by the sitemap we found
+        
         # Check robots.txt for sitemap references
         try:
-            robots_response = session.get(f"https://{domain}/robots.txt", timeout=5)
+            robots_response = session.get(f"https://{domain}/robots.txt", timeout=(CONNECT_TIMEOUT, 5))
             if robots_response.status_code == 200:
                 robots_content = robots_response.text.lower()
                 for line in robots_content.split('\n'):
                     if 'sitemap:' in line:
                         sitemap_url = line.split('sitemap:', 1)[1].strip()
                         try:
-                            sitemap_response = session.get(sitemap_url, timeout=timeout_seconds)
-                            if sitemap_response.status_code == 200:
-                                root = ElementTree.fromstring(sitemap_response.content)
-                                urls = root.findall('.//{http://www.sitemaps.org/schemas/sitemap/0.9}url')
-                                if urls:
-                                    total_pages = len(urls)
-                                    method = "Robots.txt sitemap"
-                                    return total_pages, method
+                            parsed = fetch_sitemap_once(session, sitemap_url, timeout)
+                            if parsed and parsed[0]:
+                                total_pages = parsed[0]
+                                method = "Robots.txt sitemap"
+                                # Validators only vouch for a count taken from that file alone
+                                return total_pages, method, None if parsed[1] else parsed[3]
                         except:
                             continue
         except:
@@ -135,66 +353,154 @@ def get_page_count(domain, timeout_seconds=15):
         
         # Final fallback - try to verify domain exists and estimate
         try:
-            response = session.get(f"https://{domain}", timeout=5)
-            if response.status_code == 200:
-                # Very rough estimation based on common site patterns
-                content = response.text.lower()
-                
-                # Look for navigation indicators
-                nav_indicators = ['menu', 'navigation', 'nav-', 'href=', 'services', 'products', 'about']
-                indicator_count = sum(content.count(indicator) for indicator in nav_indicators)
-                
-                # Rough estimation based on site complexity
-                if indicator_count > 50:
-                    total_pages = max(10, min(indicator_count // 10, 50))  # 10-50 page estimate
-                    method = "Homepage analysis (estimate)"
-                else:
-                    total_pages = 5  # Conservative small site estimate
-                    method = "Small site estimate"
+            with session.get(f"https://{domain}", timeout=(CONNECT_TIMEOUT, 5), stream=True) as response:
+                if response.status_code == 200:
+                    # Very rough estimation based on common site patterns - the start of the page is enough
+                    sample = next(response.iter_content(HOMEPAGE_SAMPLE_BYTES), b'')
+                    content = sample.decode(response.encoding or 'utf-8', errors='ignore').lower()
+                    
+                    # Look for navigation indicators
+                    nav_indicators = ['menu', 'navigation', 'nav-', 'href=', 'services', 'products', 'about']
+                    indicator_count = sum(content.count(indicator) for indicator in nav_indicators)
+                    
+                    # Rough estimation based on site complexity
+                    if indicator_count > 50:
+                        total_pages = max(10, min(indicator_count // 10, 50))  # 10-50 page estimate
+                        method = "Homepage analysis (estimate)"
+                    else:
+                        total_pages = 5  # Conservative small site estimate
+                        method = "Small site estimate"
         except:
             method = "Domain inaccessible"
     
-    return total_pages, method
+    return total_pages, method, validators
+
+DNS_PREFETCH_TIMEOUT = 5  # Don't let a slow resolver hold up the whole batch
+
+def resolve_host(host):
+    """Resolve a hostname, ignoring failures (the HTTP stage reports unreachable domains)"""
+    try:
+        socket.getaddrinfo(host, 443, type=socket.SOCK_STREAM)
+    except OSError:
+        pass
+
+def prefetch_dns(domains):
+    """Resolve every host the sitemap probes will use in parallel, warming the resolver cache"""
+    hosts = []
+    for domain in domains:
+        hosts.append(domain)
+        if not has_subdomain(domain):
+            hosts.append(f"www.{domain}")
+    if not hosts:
+        return
+    
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
+        wait([executor.submit(resolve_host, host) for host in hosts], timeout=DNS_PREFETCH_TIMEOUT)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 def process_domains_batch(domains, progress_callback=None):
-    """Process domains with timeout and progress tracking"""
-    results = []
+    """Process domains with timeout and progress tracking, returning a results DataFrame"""
+    # Results are collected column-wise so the DataFrame is built without per-row dicts
+    domains_out = []
+    pages_out = []
+    methods_out = []
+    session = get_session()
+    cache = get_cache()
+    
+    # Serve fresh cache entries directly; stale ones are passed on for revalidation
+    pending_domains = []
+    stale_entries = {}
+    for domain in domains:
+        cached = cache.get(domain)
+        ttl = CACHE_TTL if cached and cached['pages'] else FAILED_CACHE_TTL
+        if cached and time.time() - cached['ts'] < ttl:
+            domains_out.append(domain)
+            pages_out.append(cached['pages'])
+            methods_out.append(cached['method'])
+        else:
+            pending_domains.append(domain)
+            if cached:
+                stale_entries[domain] = cached
+    
+    completed = len(domains_out)
+    if progress_callback and completed:
+        progress_callback(completed, len(domains))
     
-    with ThreadPoolExecutor(max_workers=10) as executor:
+    prefetch_dns(pending_domains)
+    
+    # Not a context manager: on the overall timeout we must not wait for in-flight workers
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    try:
         # Submit all tasks
         future_to_domain = {
-            executor.submit(get_page_count, domain, 20): domain 
-            for domain in domains
+            executor.submit(get_page_count, domain, session, 20, stale_entries.get(domain)): domain 
+            for domain in pending_domains
         }
         
-        completed = 0
-        for future in as_completed(future_to_domain, timeout=300):  # 5 minute overall timeout
-            domain = future_to_domain[future]
-            try:
-                pages, method = future.result(timeout=25)  # Individual task timeout
-                results.append({
-                    'Domain': domain,
-                    'Pages': pages,
-                    'Method': method
-                })
-            except TimeoutError:
-                results.append({
-                    'Domain': domain,
-                    'Pages': 0,
-                    'Method': 'Timeout'
-                })
-            except Exception as e:
-                results.append({
-                    'Domain': domain,
-                    'Pages': 0,
-                    'Method': f'Error: {str(e)[:50]}'
-                })
+        try:
+            for future in as_completed(future_to_domain, timeout=300):  # 5 minute overall timeout
+                domain = future_to_domain[future]
+                try:
+                    pages, method, validators = future.result(timeout=25)  # Individual task timeout
+                    # Failures are cached too, for less time, so dead domains aren't re-probed every run.
+                    # Entries with validators outlive their TTL so they can be revalidated cheaply.
+                    cache.set(
+                        domain,
+                        {'pages': pages, 'method': method, 'ts': time.time(), **(validators or {})},
+                        expire=CACHE_RETAIN if validators else (CACHE_TTL if pages else FAILED_CACHE_TTL)
+                    )
+                except TimeoutError:
+                    pages, method = 0, 'Timeout'
+                except Exception as e:
+                    pages, method = 0, f'Error: {str(e)[:50]}'
+                
+                domains_out.append(domain)
+                pages_out.append(pages)
+                methods_out.append(method)
+                
+                completed += 1
+                if progress_callback:
+                    progress_callback(completed, len(domains))
+        except TimeoutError:
+            # Give up on everything still outstanding rather than overrunning the budget
+            recorded = set(domains_out)
+            for future, domain in future_to_domain.items():
+                if domain not in recorded:
+                    future.cancel()
+                    domains_out.append(domain)
+                    pages_out.append(0)
+                    methods_out.append('Batch timeout')
             
-            completed += 1
             if progress_callback:
-                progress_callback(completed, len(domains))
+                progress_callback(len(domains), len(domains))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return pd.DataFrame({
+        'Domain': domains_out,
+        'Pages': np.asarray(pages_out, dtype=np.int64),
+        'Method': methods_out
+    })
+
+@st.cache_data(show_spinner=False)
+def build_excel(df, summary_df):
+    """Build the Excel export, cached so reruns don't rewrite an unchanged workbook"""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        # Main results
+        df_export = df[['Domain', 'Pages']].sort_values('Pages', ascending=False)
+        df_export.to_excel(writer, sheet_name='Results', index=False)
+        
+        summary_df.to_excel(writer, sheet_name='Summary', index=False)
+        
+        # Detailed results with method
+        df.sort_values('Pages', ascending=False).to_excel(
+            writer, sheet_name='Detailed', index=False
+        )
     
-    return results
+    return output.getvalue()
 
 # Main interface
 st.markdown("### Enter URLs or Domains")
@@ -213,128 +519,130 @@ with col1:
     analyze_button = st.button("🔍 Analyse Domains", type="primary")
 
 with col2:
-    if url_input:
-        lines = [line.strip() for line in url_input.split('\n') if line.strip()]
-        domains = [clean_domain(line) for line in lines]
-        domains = [d for d in domains if d]  # Remove None values
-        unique_domains = list(dict.fromkeys(domains))  # Remove duplicates
-        
-        if unique_domains:
-            st.info(f"Found {len(unique_domains)} unique domains to analyse")
+    unique_domains = parse_input(url_input) if url_input else []
+    
+    if unique_domains:
+        st.info(f"Found {len(unique_domains)} unique domains to analyse")
 
 # Process domains when button is clicked
 if analyze_button and url_input:
-    lines = [line.strip() for line in url_input.split('\n') if line.strip()]
-    domains = [clean_domain(line) for line in lines]
-    domains = [d for d in domains if d]
-    unique_domains = list(dict.fromkeys(domains))
-    
     if unique_domains:
-        # Progress tracking
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        def update_progress(completed, total):
-            progress = completed / total
-            progress_bar.progress(progress)
-            status_text.text(f"Analysed {completed}/{total} domains")
-        
-        start_time = time.time()
-        
-        # Process domains
-        results = process_domains_batch(unique_domains, update_progress)
+        domains_key = tuple(sorted(unique_domains))
+        last_run = st.session_state.get('last_run')
         
-        end_time = time.time()
-        processing_time = end_time - start_time
-        
-        # Clear progress indicators
-        progress_bar.empty()
-        status_text.empty()
-        
-        if results:
-            # Convert to DataFrame
-            df = pd.DataFrame(results)
-            
-            # Display results
-            st.success(f"Analysis complete! Processed {len(results)} domains in {processing_time:.1f} seconds")
+        # Re-analysing the same list within the TTL reuses the previous results
+        if (
+            not last_run
+            or last_run['domains'] != domains_key
+            or time.time() - last_run['finished_at'] > ANALYSIS_TTL
+        ):
+            # Progress tracking
+            progress_bar = st.progress(0)
+            status_text = st.empty()
             
-            # Summary metrics
-            col1, col2, col3, col4 = st.columns(4)
+            last_update = [0.0]
             
-            successful = len(df[df['Pages'] > 0])
-            total_pages = df['Pages'].sum()
-            avg_pages = df[df['Pages'] > 0]['Pages'].mean() if successful > 0 else 0
+            def update_progress(completed, total):
+                # Each update is a round trip to the browser, so throttle them on big batches
+                now = time.time()
+                if completed < total and now - last_update[0] < PROGRESS_INTERVAL:
+                    return
+                last_update[0] = now
+                
+                progress = completed / total
+                progress_bar.progress(progress)
+                status_text.text(f"Analysed {completed}/{total} domains")
             
-            with col1:
-                st.metric("Domains Processed", len(results))
-            with col2:
-                st.metric("Successful Scans", successful)
-            with col3:
-                st.metric("Total Pages Found", f"{total_pages:,}")
-            with col4:
-                st.metric("Average Pages", f"{avg_pages:,.0f}" if avg_pages > 0 else "N/A")
+            start_time = time.time()
             
-            # Show results table
-            st.markdown("### Results")
+            # Process domains
+            df = process_domains_batch(unique_domains, update_progress)
             
-            # Sort by pages descending
-            df_display = df.sort_values('Pages', ascending=False)
-            st.dataframe(df_display, use_container_width=True)
+            end_time = time.time()
+            processing_time = end_time - start_time
             
-            # Create Excel file for download
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # Main results
-                df_export = df[['Domain', 'Pages']].sort_values('Pages', ascending=False)
-                df_export.to_excel(writer, sheet_name='Results', index=False)
-                
-                # Summary sheet
-                summary_data = {
-                    'Metric': [
-                        'Total Domains Processed',
-                        'Successful Scans',
-                        'Total Pages Found',
-                        'Average Pages (successful scans)',
-                        'Processing Time (seconds)'
-                    ],
-                    'Value': [
-                        len(results),
-                        successful,
-                        total_pages,
-                        f"{avg_pages:.0f}" if avg_pages > 0 else "N/A",
-                        f"{processing_time:.1f}"
-                    ]
-                }
-                summary_df = pd.DataFrame(summary_data)
-                summary_df.to_excel(writer, sheet_name='Summary', index=False)
-                
-                # Detailed results with method
-                df.sort_values('Pages', ascending=False).to_excel(
-                    writer, sheet_name='Detailed', index=False
-                )
+            # Clear progress indicators
+            progress_bar.empty()
+            status_text.empty()
             
-            excel_data = output.getvalue()
-            
-            # Download button
-            st.download_button(
-                label="📥 Download Results (Excel)",
-                data=excel_data,
-                file_name=f"domain_page_count_{int(time.time())}.xlsx",
-                mime="application/vnd.openxlxml"
-            )
-            
-            # Show any issues
-            failed_domains = df[df['Pages'] == 0]
-            if not failed_domains.empty:
-                with st.expander(f"⚠️ Issues with {len(failed_domains)} domains"):
-                    st.dataframe(failed_domains[['Domain', 'Method']], use_container_width=True)
+            st.session_state['last_run'] = {
+                'domains': domains_key,
+                'results': df,
+                'processing_time': processing_time,
+                'finished_at': end_time
+            }
     else:
         st.error("Please enter valid URLs or domains")
 
+# Results stay on screen across reruns (e.g. the download click) while the input is unchanged
+last_run = st.session_state.get('last_run')
+if last_run and unique_domains and last_run['domains'] == tuple(sorted(unique_domains)):
+    df = last_run['results']
+    processing_time = last_run['processing_time']
+    
+    if not df.empty:
+        # Display results
+        st.success(f"Analysis complete! Processed {len(df)} domains in {processing_time:.1f} seconds")
+        
+        # Summary metrics
+        col1, col2, col3, col4 = st.columns(4)
+        
+        successful = len(df[df['Pages'] > 0])
+        total_pages = df['Pages'].sum()
+        avg_pages = df[df['Pages'] > 0]['Pages'].mean() if successful > 0 else 0
+        
+        with col1:
+            st.metric("Domains Processed", len(df))
+        with col2:
+            st.metric("Successful Scans", successful)
+        with col3:
+            st.metric("Total Pages Found", f"{total_pages:,}")
+        with col4:
+            st.metric("Average Pages", f"{avg_pages:,.0f}" if avg_pages > 0 else "N/A")
+        
+        # Show results table
+        st.markdown("### Results")
+        
+        # Sort by pages descending
+        df_display = df.sort_values('Pages', ascending=False)
+        st.dataframe(df_display, use_container_width=True)
+        
+        # Summary sheet
+        summary_df = pd.DataFrame({
+            'Metric': [
+                'Total Domains Processed',
+                'Successful Scans',
+                'Total Pages Found',
+                'Average Pages (successful scans)',
+                'Processing Time (seconds)'
+            ],
+            'Value': [
+                len(df),
+                successful,
+                total_pages,
+                f"{avg_pages:.0f}" if avg_pages > 0 else "N/A",
+                f"{processing_time:.1f}"
+            ]
+        })
+        
+        # Download button
+        st.download_button(
+            label="📥 Download Results (Excel)",
+            data=build_excel(df, summary_df),
+            file_name=f"domain_page_count_{int(time.time())}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+        
+        # Show any issues
+        failed_domains = df[df['Pages'] == 0]
+        if not failed_domains.empty:
+            with st.expander(f"⚠️ Issues with {len(failed_domains)} domains"):
+                st.dataframe(failed_domains[['Domain', 'Method']], use_container_width=True)
+
 # Sidebar info
 with st.sidebar:
     st.markdown("### How it works")
-    st.markdown("""
+    st.markdown(f"""
     1. **Input**: Paste URLs or domains (one per line)
     2. **Analysis**: Checks common sitemap locations
     3. **Export**: Download results as Excel file
@@ -342,7 +650,7 @@ with st.sidebar:
     **Timeout Settings:**
     - Individual domain: 20 seconds
     - Overall process: 5 minutes
-    - Max concurrent: 10 domains
+    - Max concurrent: {MAX_WORKERS} domains
     """)
     
     st.markdown("### Supported Formats")